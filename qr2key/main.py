@@ -3,15 +3,22 @@
 import sys
 import os
 import platform
-import qrcode
+import functools
+import logging
+import math
+import selectors
 import time
 import serial
 import serial.tools.list_ports
-from PIL import Image
-from cryptography.fernet import Fernet
-from pynput.keyboard import Controller
 
-if platform.system() == 'Windows':
+# qrcode、PIL、cryptography、pynputは読み込みに時間がかかるため、
+# 通常の「読み取り→入力」の流れで使わないものは使用する関数内でインポートする
+
+log = logging.getLogger("qr2key")
+
+IS_WINDOWS = platform.system() == 'Windows'
+
+if IS_WINDOWS:
     try:
         import win32clipboard
         import win32con
@@ -22,12 +29,82 @@ if platform.system() == 'Windows':
 else:
     WIN32_AVAILABLE = False
 
+# Windowsでは文字列全体のキーイベントを1回のSendInput呼び出しで送る
+if IS_WINDOWS:
+    import ctypes
+    from ctypes import wintypes
+
+    _INPUT_KEYBOARD = 1
+    _KEYEVENTF_KEYUP = 0x0002
+    _KEYEVENTF_UNICODE = 0x0004
+    # pynputのtype()と同様に、改行とタブは仮想キーとして送る
+    _VK_CONTROL_CODES = {'\n': 0x0D, '\r': 0x0D, '\t': 0x09}
+
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ('dx', wintypes.LONG),
+            ('dy', wintypes.LONG),
+            ('mouseData', wintypes.DWORD),
+            ('dwFlags', wintypes.DWORD),
+            ('time', wintypes.DWORD),
+            ('dwExtraInfo', ctypes.c_size_t),
+        ]
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [
+            ('wVk', wintypes.WORD),
+            ('wScan', wintypes.WORD),
+            ('dwFlags', wintypes.DWORD),
+            ('time', wintypes.DWORD),
+            ('dwExtraInfo', ctypes.c_size_t),
+        ]
+
+    class _HARDWAREINPUT(ctypes.Structure):
+        _fields_ = [
+            ('uMsg', wintypes.DWORD),
+            ('wParamL', wintypes.WORD),
+            ('wParamH', wintypes.WORD),
+        ]
+
+    class _INPUTUNION(ctypes.Union):
+        _fields_ = [('mi', _MOUSEINPUT), ('ki', _KEYBDINPUT), ('hi', _HARDWAREINPUT)]
+
+    class _INPUT(ctypes.Structure):
+        _anonymous_ = ('u',)
+        _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int)
+    _user32.SendInput.restype = wintypes.UINT
+    SENDINPUT_AVAILABLE = True
+else:
+    SENDINPUT_AVAILABLE = False
+
 
 def generate_key():
     """Generate a new cryptographic key."""
+    from cryptography.fernet import Fernet
     return Fernet.generate_key()
 
 
+# Fernetキー（URLセーフBase64で44文字）が誤り訂正レベルHで収まる最小のバージョン
+_FERNET_QR_VERSION = 5
+
+
+@functools.lru_cache(maxsize=1)
+def _qr_template():
+    """Return the shared QRCode instance reused by key_to_qr."""
+    import qrcode
+    import qrcode.image.pil
+    return qrcode.QRCode(
+        version=_FERNET_QR_VERSION,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+        image_factory=qrcode.image.pil.PilImage,
+    )
+
+
 def key_to_qr(key, output_path='key_qr.png'):
     """Convert a cryptographic key to a QR code image.
     
@@ -38,38 +115,92 @@ def key_to_qr(key, output_path='key_qr.png'):
     Returns:
         The path to the saved QR code image
     """
+    from qrcode.exceptions import DataOverflowError
+    
     key_str = key.decode('utf-8') if isinstance(key, bytes) else str(key)
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
-    )
+    qr = _qr_template()
+    qr.clear()
+    qr.version = _FERNET_QR_VERSION
     qr.add_data(key_str)
-    qr.make(fit=True)
+    try:
+        # Fernetキーは長さが固定なのでバージョン探索を省略する
+        qr.make(fit=False)
+    except DataOverflowError:
+        # 長いデータの場合のみ、収まるバージョンを探す
+        qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
-    img.save(output_path)
+    # 白黒の1ビット画像なので、圧縮率を下げてもサイズはほとんど変わらない
+    img.save(output_path, format='PNG', optimize=False, compress_level=1)
     return output_path
 
 
-def copy_to_clipboard(text):
-    """Copy text to clipboard.
+def _copy_win32(text):
+    """Copy text to the Windows clipboard as CF_UNICODETEXT using pywin32."""
+    win32clipboard.OpenClipboard()
+    try:
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardText(text, win32con.CF_UNICODETEXT)
+    finally:
+        win32clipboard.CloseClipboard()
+    print("Text copied to clipboard.")
+
+
+def _copy_stub(text):
+    """Print the text instead of copying it when pywin32 is unavailable."""
+    print("Clipboard functionality is only available on Windows.")
+    print(f"Text to copy: {text}")
+
+
+# The implementation is chosen once at import time.
+copy_to_clipboard = _copy_win32 if WIN32_AVAILABLE else _copy_stub
+copy_to_clipboard.__doc__ = """Copy text to clipboard.
     
     On Windows, uses pywin32. On other platforms, prints a message.
     
     Args:
         text: The text to copy to clipboard
     """
-    if WIN32_AVAILABLE:
-        win32clipboard.OpenClipboard()
-        win32clipboard.EmptyClipboard()
-        win32clipboard.SetClipboardText(text, win32con.CF_UNICODETEXT)
-        win32clipboard.CloseClipboard()
-        print("Text copied to clipboard.")
-    else:
-        print("Clipboard functionality is only available on Windows.")
-        print(f"Text to copy: {text}")
+
+
+def copy_many_to_clipboard(texts, separator='\r\n'):
+    """Copy several texts to the clipboard in a single clipboard session.
+    
+    The clipboard holds a single text entry, so the texts are joined with
+    ``separator`` and the clipboard is opened and closed only once.
+    
+    Args:
+        texts: Iterable of texts to copy
+        separator: String inserted between texts
+    """
+    copy_to_clipboard(separator.join(texts))
+
+
+# comports() はWindowsではレジストリを走査するため、短時間だけ結果を再利用する
+_PORTS_CACHE_TTL = 3.0
+_ports_cache = {'t': 0.0, 'v': None}
+
+
+def _cached_comports(ttl=_PORTS_CACHE_TTL):
+    """
+    serial.tools.list_ports.comports() の結果をTTL付きでキャッシュして返します。
+
+    Args:
+        ttl: キャッシュの有効期間（秒）
+
+    Returns:
+        ListPortInfoのリスト
+    """
+    now = time.monotonic()
+    if _ports_cache['v'] is None or now - _ports_cache['t'] > ttl:
+        _ports_cache['v'] = list(serial.tools.list_ports.comports())
+        _ports_cache['t'] = now
+    return _ports_cache['v']
+
+
+def invalidate_ports_cache():
+    """COMポート一覧のキャッシュを破棄し、次回の呼び出しで再取得させます。"""
+    _ports_cache['v'] = None
 
 
 def list_com_ports():
@@ -79,16 +210,21 @@ def list_com_ports():
     Returns:
         利用可能なCOMポートのリスト
     """
-    ports = list(serial.tools.list_ports.comports())
+    ports = _cached_comports()
     if not ports:
         print("利用可能なCOMポートが見つかりません。")
         return []
     
     print("利用可能なCOMポート:")
-    for i, port in enumerate(ports):
-        print(f"{i+1}. {port.device} - {port.description}")
+    # 表示とデバイス名の収集を1回のループで行う
+    devices = []
+    append = devices.append
+    for i, port in enumerate(ports, 1):
+        device = port.device
+        print(f"{i}. {device} - {port.description}")
+        append(device)
     
-    return [port.device for port in ports]
+    return devices
 
 
 def select_com_port():
@@ -102,26 +238,111 @@ def select_com_port():
     if not ports:
         return None
     
-    try:
+    while True:
         selection = input("\nCOMポート番号を入力してください（1～" + str(len(ports)) + "）、または'q'で終了: ")
         if selection.lower() == 'q':
             return None
         
-        index = int(selection) - 1
+        try:
+            index = int(selection) - 1
+        except ValueError:
+            print("数値を入力してください。")
+            continue
+        
         if 0 <= index < len(ports):
             return ports[index]
-        else:
-            print("無効な選択です。")
-            return select_com_port()  # 再帰的に再試行
-    except ValueError:
-        print("数値を入力してください。")
-        return select_com_port()  # 再帰的に再試行
+        print("無効な選択です。")
 
 
-def read_qr_from_com_port(port, baudrate=9600, timeout=1.0):
+# Windowsで受信待ちをする際に in_waiting を確認する間隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+def _wait_for_data(ser, timeout):
     """
-    指定されたCOMポートからQRコードデータを読み取ります。
-    データはShift_JISエンコードされていると想定します。
+    シリアルポートに受信データが届くまで待機します。
+
+    ブロッキング読み取りの代わりに、POSIXでは selectors でファイルディスクリプタを
+    監視し、Windowsでは in_waiting を一定間隔で確認します。待機中もCtrl+Cで
+    すぐに中断できます。
+
+    Args:
+        ser: オープン済みのシリアルポート
+        timeout: 最大待機時間（秒）。Noneの場合は無期限に待機します
+
+    Returns:
+        受信データがあればTrue、タイムアウトした場合はFalse
+    """
+    if ser.in_waiting:
+        return True
+    
+    if not IS_WINDOWS:
+        with selectors.DefaultSelector() as sel:
+            sel.register(ser.fileno(), selectors.EVENT_READ)
+            return bool(sel.select(timeout))
+    
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not ser.in_waiting:
+        if deadline is None:
+            time.sleep(_POLL_INTERVAL)
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(_POLL_INTERVAL, remaining))
+    return True
+
+
+def _read_frame(ser, timeout=None):
+    """
+    COMポートから改行（LF）までのデータを1フレーム分読み取ります。
+
+    最初のデータが届くまでは _wait_for_data() で待機し、その後は1バイトずつ
+    読み取る readline() の代わりに、受信バッファに溜まっている分を1回の
+    read() でまとめて取得します。readline() と同様、受信したデータがLFで
+    終わった時点で読み取りを終了するため、データ中のCR（改行を含むQRコード）は
+    そのまま残ります。
+
+    Args:
+        ser: オープン済みのシリアルポート
+        timeout: 最初のデータを待つ最大時間（秒）。省略時はポートのタイムアウト
+
+    Returns:
+        受信したデータ（タイムアウトまでに何も受信しなかった場合は空のbytes）
+    """
+    if not _wait_for_data(ser, ser.timeout if timeout is None else timeout):
+        return b''
+    
+    buf = bytearray()
+    while True:
+        chunk = ser.read(ser.in_waiting or 1)
+        if not chunk:
+            # readline() と同様、タイムアウト時は受信済みの分を返す
+            break
+        buf += chunk
+        if buf.endswith(b'\n'):
+            break
+    return bytes(buf)
+
+
+def _discard_stale_input(ser):
+    """
+    スキャン待ちを始める前に、それまでに受信していたデータを破棄します。
+    
+    ポートはメニューや確認プロンプトの表示中も開いたままなので、その間に
+    スキャンされたデータを次の読み取りで入力しないようにします。
+    _read_frame() は改行を含むデータもフレーム全体をまとめて返すため、
+    直前に読み取ったスキャンの一部がここで失われることはありません。
+    
+    Args:
+        ser: オープン済みのシリアルポート
+    """
+    ser.reset_input_buffer()
+
+
+def _open_port(port, baudrate=9600, timeout=1.0):
+    """
+    指定されたCOMポートを開きます。
     
     Args:
         port: COMポート名（例：'COM3'）
@@ -129,63 +350,264 @@ def read_qr_from_com_port(port, baudrate=9600, timeout=1.0):
         timeout: 読み取りタイムアウト（秒）
         
     Returns:
-        読み取られたデータを文字列として返します。エラーの場合はNoneを返します。
+        オープンしたシリアルポート。エラーの場合はNoneを返します。
     """
     try:
         ser = serial.Serial(port, baudrate, timeout=timeout)
-        print(f"{port}を開きました。QRコードをスキャンしてください...")
+    except serial.SerialException as e:
+        print(f"COMポートエラー: {e}")
+        return None
+    print(f"{port}を開きました。")
+    return ser
+
+
+# str.strip() が取り除くASCIIの空白文字（bytes.strip() の既定値より広い）
+_ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
+
+
+def _decode_qr_data(data):
+    """
+    受信したQRコードデータを文字列にデコードします。
+    データはShift_JISエンコードされていると想定します。
+    
+    Args:
+        data: 受信データ（bytes）
         
-        data = ser.readline()
-        if data:
-            # Shift_JISでデコード
-            try:
-                decoded_data = data.decode('shift_jis', errors='replace').strip()
-                print(f"データを受信しました（{len(decoded_data)}文字）")
-                return decoded_data
-            except UnicodeDecodeError:
-                print("Shift_JISデコードエラー。他のエンコーディングを試します...")
-                try:
-                    # フォールバックとしてUTF-8を試す
-                    decoded_data = data.decode('utf-8', errors='replace').strip()
-                    print(f"UTF-8でデコードしました（{len(decoded_data)}文字）")
-                    return decoded_data
-                except:
-                    print("デコードエラー。データを処理できません。")
-                    return None
-        else:
-            print("データを受信できませんでした。")
+    Returns:
+        デコードされた文字列。エラーの場合はNoneを返します。
+    """
+    # 終端のCR/LFや空白は、デコード前にbytesのまま取り除く
+    data = data.strip(_ASCII_WHITESPACE)
+    
+    # 暗号鍵やURLなどASCIIのみのデータはShift_JISを経由せずにデコードする
+    if data.isascii():
+        decoded_data = data.decode('ascii')
+        print(f"データを受信しました（{len(decoded_data)}文字）")
+        return decoded_data
+    
+    # Shift_JISでデコード
+    try:
+        # 全角スペース（U+3000）などはデコード後でないと取り除けない
+        decoded_data = data.decode('shift_jis', errors='replace').strip()
+        print(f"データを受信しました（{len(decoded_data)}文字）")
+        return decoded_data
+    except UnicodeDecodeError:
+        print("Shift_JISデコードエラー。他のエンコーディングを試します...")
+        try:
+            # フォールバックとしてUTF-8を試す
+            decoded_data = data.decode('utf-8', errors='replace').strip()
+            print(f"UTF-8でデコードしました（{len(decoded_data)}文字）")
+            return decoded_data
+        except:
+            print("デコードエラー。データを処理できません。")
             return None
+
+
+def read_qr(ser):
+    """
+    オープン済みのシリアルポートからQRコードデータを1件読み取ります。
+    
+    Args:
+        ser: オープン済みのシリアルポート
         
+    Returns:
+        読み取られたデータを文字列として返します。エラーの場合はNoneを返します。
+    """
+    try:
+        _discard_stale_input(ser)
+        print("QRコードをスキャンしてください...")
+        data = _read_frame(ser)
     except serial.SerialException as e:
         print(f"COMポートエラー: {e}")
         return None
-    finally:
-        if 'ser' in locals() and ser.is_open:
-            ser.close()
-            print(f"{port}を閉じました。")
+    
+    if data:
+        return _decode_qr_data(data)
+    print("データを受信できませんでした。")
+    return None
+
+
+def read_qr_stream(ser):
+    """
+    オープン済みのシリアルポートからQRコードデータを連続して読み取ります。
+    
+    ポートを開いたまま、スキャンされるたびにデコードした文字列を返す
+    ジェネレーターです。タイムアウトしても読み取りを続け、COMポートエラーが
+    発生した場合に終了します。各スキャン待ちの開始時に、それまでに受信して
+    いたデータ（プロンプト表示中のスキャンなど）は破棄します。
+    
+    Args:
+        ser: オープン済みのシリアルポート
+        
+    Yields:
+        読み取られたデータの文字列
+    """
+    while True:
+        data = b''
+        try:
+            _discard_stale_input(ser)
+            print("QRコードをスキャンしてください...（Ctrl+Cで中断）")
+            # タイムアウトや改行のみの受信は無視して待ち続ける
+            while not data.strip():
+                data = _read_frame(ser)
+        except serial.SerialException as e:
+            print(f"COMポートエラー: {e}")
+            return
+        
+        decoded_data = _decode_qr_data(data)
+        if decoded_data:
+            yield decoded_data
+
+
+def _prompt_continue():
+    """
+    続けてQRコードを読み取るかどうかをユーザーに確認します。
+    
+    Returns:
+        続ける場合はTrue
+    """
+    answer = input("続けて読み取りますか？ (Y/n): ").strip().lower()
+    return answer != 'n'
+
+
+def read_qr_from_com_port(port, baudrate=9600, timeout=1.0):
+    """
+    指定されたCOMポートを開いてQRコードデータを1件読み取り、ポートを閉じます。
+    
+    連続して読み取る場合は _open_port() でポートを開いたまま read_qr() を
+    呼び出してください。
+    
+    Args:
+        port: COMポート名（例：'COM3'）
+        baudrate: ボーレート
+        timeout: 読み取りタイムアウト（秒）
+        
+    Returns:
+        読み取られたデータを文字列として返します。エラーの場合はNoneを返します。
+    """
+    ser = _open_port(port, baudrate, timeout)
+    if ser is None:
+        return None
+    with ser:
+        data = read_qr(ser)
+    print(f"{port}を閉じました。")
+    return data
+
+
+def _send_input(text):
+    """
+    Windowsで文字列全体のキーイベントを1回のSendInput呼び出しで送信します。
+    
+    Args:
+        text: 入力するテキスト
+    """
+    events = []
+    for ch in text:
+        vk = _VK_CONTROL_CODES.get(ch)
+        if vk is not None:
+            events.append((vk, 0, 0))
+            events.append((vk, 0, _KEYEVENTF_KEYUP))
+            continue
+        # BMP外の文字はサロゲートペアの各コードユニットを送る
+        units = ch.encode('utf-16-le')
+        for i in range(0, len(units), 2):
+            scan = int.from_bytes(units[i:i + 2], 'little')
+            events.append((0, scan, _KEYEVENTF_UNICODE))
+            events.append((0, scan, _KEYEVENTF_UNICODE | _KEYEVENTF_KEYUP))
+    
+    inputs = (_INPUT * len(events))()
+    for inp, (vk, scan, flags) in zip(inputs, events):
+        inp.type = _INPUT_KEYBOARD
+        inp.ki.wVk = vk
+        inp.ki.wScan = scan
+        inp.ki.dwFlags = flags
+    
+    sent = _user32.SendInput(len(inputs), inputs, ctypes.sizeof(_INPUT))
+    if sent != len(inputs):
+        raise ctypes.WinError(ctypes.get_last_error())
+
+
+@functools.lru_cache(maxsize=1)
+def _pynput_keyboard():
+    """
+    pynputのキーボードコントローラーと制御文字のキー対応表を返します。
+    
+    初回呼び出し時にpynputをインポートし、以降は同じオブジェクトを再利用します。
+    """
+    from pynput.keyboard import Controller, Key
+    # pynputのtype()と同様に、改行とタブは対応するキーとして送る
+    control_keys = {'\n': Key.enter, '\r': Key.enter, '\t': Key.tab}
+    return Controller(), control_keys
+
+
+def _type_text(text):
+    """
+    テキストをキーボード入力として送信します。
+    
+    Windowsでは SendInput で一括送信し、それ以外ではキーを事前に解決してから
+    pynputで押下・解放します。
+    
+    Args:
+        text: 入力するテキスト
+    """
+    if SENDINPUT_AVAILABLE:
+        _send_input(text)
+        return
+    
+    from pynput.keyboard import KeyCode
+    
+    keyboard, control_keys = _pynput_keyboard()
+    keys = [control_keys.get(ch) or KeyCode.from_char(ch) for ch in text]
+    for key in keys:
+        keyboard.press(key)
+        keyboard.release(key)
+
+
+_DEFAULT_INPUT_DELAY = 3.0
+
+
+def _input_delay():
+    """
+    環境変数 QR2KEY_DELAY から入力前の待機時間（秒）を取得します。
+    
+    Returns:
+        待機時間（秒）。未設定または不正な値の場合は既定値（3秒）
+    """
+    value = os.environ.get('QR2KEY_DELAY')
+    if value is None:
+        return _DEFAULT_INPUT_DELAY
+    try:
+        delay = float(value)
+    except ValueError:
+        delay = None
+    # inf や nan は time.sleep() で扱えないため不正な値とする
+    if delay is None or not math.isfinite(delay):
+        print(f"QR2KEY_DELAYの値が不正です（{value}）。{_DEFAULT_INPUT_DELAY:g}秒を使用します。")
+        return _DEFAULT_INPUT_DELAY
+    return max(0.0, delay)
 
 
-def simulate_keyboard_input(text):
+def simulate_keyboard_input(text, delay=_DEFAULT_INPUT_DELAY):
     """
     指定されたテキストをキーボード入力としてシミュレートします。
     
     Args:
         text: 入力するテキスト
+        delay: 入力開始までの待機時間（秒）。0または標準入力が端末でない場合は待機しません
     """
     if not text:
         print("入力するテキストがありません。")
         return
     
     print(f"入力準備中: {len(text)}文字")
-    print("3秒以内にテキスト入力欄にカーソルを合わせてください...")
-    for i in range(3, 0, -1):
-        print(f"{i}...")
-        time.sleep(1)
+    # 待機はカーソルを合わせるための操作時間なので、対話的でない場合は省略する
+    if delay > 0 and sys.stdin.isatty():
+        print(f"{delay:g}秒以内にテキスト入力欄にカーソルを合わせてください...")
+        time.sleep(delay)
     
-    keyboard = Controller()
     try:
         print("入力中...")
-        keyboard.type(text)
+        _type_text(text)
         print("入力完了しました。")
     except Exception as e:
         print(f"キーボード入力エラー: {e}")
@@ -204,84 +626,136 @@ def main():
         print("操作をキャンセルしました。")
         return
     
-    while True:
-        print("\nオプションを選択してください:")
-        print("1. QRコードを読み取ってキーボード入力する")
-        print("2. COMポートを変更する")
-        print("q. 終了")
-        
-        choice = input("選択: ").strip().lower()
-        
-        if choice == '1':
-            # QRコード読み取りとキーボード入力
-            qr_data = read_qr_from_com_port(port)
-            if qr_data:
-                simulate_keyboard_input(qr_data)
-        
-        elif choice == '2':
-            # COMポート変更
-            new_port = select_com_port()
-            if new_port:
-                port = new_port
-                print(f"COMポートを {port} に変更しました。")
-        
-        elif choice == 'q':
-            print("QR2Keyを終了します。")
-            break
-        
-        else:
-            print("無効な選択です。もう一度試してください。")
+    # スキャンのたびに開き直さないよう、ポートはメニューの間も開いたままにする
+    ser = _open_port(port)
+    if ser is None:
+        return
+    
+    try:
+        while True:
+            print("\nオプションを選択してください:")
+            print("1. QRコードを読み取ってキーボード入力する")
+            print("2. COMポートを変更する")
+            print("q. 終了")
+            
+            choice = input("選択: ").strip().lower()
+            
+            if choice == '1':
+                # QRコード読み取りとキーボード入力（ポートを開いたまま連続して行う）
+                try:
+                    for qr_data in read_qr_stream(ser):
+                        simulate_keyboard_input(qr_data, delay=_input_delay())
+                        if not _prompt_continue():
+                            break
+                except KeyboardInterrupt:
+                    print("\n読み取りを中断しました。")
+            
+            elif choice == '2':
+                # COMポート変更（デバイスの抜き差しを反映するため一覧を取り直す）
+                invalidate_ports_cache()
+                new_port = select_com_port()
+                if new_port:
+                    # 同じポートを選び直した場合に備え、先に閉じてから開き直す
+                    ser.close()
+                    new_ser = _open_port(new_port)
+                    if new_ser is not None:
+                        port, ser = new_port, new_ser
+                        print(f"COMポートを {port} に変更しました。")
+                    else:
+                        ser = _open_port(port)
+                        if ser is None:
+                            return
+            
+            elif choice == 'q':
+                print("QR2Keyを終了します。")
+                break
+            
+            else:
+                print("無効な選択です。もう一度試してください。")
+    finally:
+        if ser is not None and ser.is_open:
+            ser.close()
+            print(f"{port}を閉じました。")
 
 
 # 開発・テスト用関数
-def test_com_port_reading(port='COM3', baudrate=9600, timeout=1):
+# 厳密なUTF-8はShift_JISのバイト列をほとんど受け付けないが、逆は多くのUTF-8の
+# バイト列を受け付けて文字化けするため、前回の結果に関係なく常にこの順で試す
+_DIAGNOSTIC_CODECS = ('utf-8', 'shift_jis')
+
+
+def _decode_diagnostic(data):
+    """
+    受信データをデコードし、使用したエンコーディング名とテキストを返します。
+    
+    ASCIIのみのデータはASCIIとしてそのままデコードします。それ以外はUTF-8、
+    Shift_JISの順に厳密にデコードし、いずれも失敗した場合はASCII（置換あり）で
+    表示します。
+    
+    Args:
+        data: 受信データ（bytes）
+        
+    Returns:
+        (エンコーディング名, デコードしたテキスト) のタプル
+    """
+    # 終端のCR/LFや空白は、デコード前にbytesのまま取り除く
+    data = data.strip(_ASCII_WHITESPACE)
+    
+    if data.isascii():
+        return 'ascii', data.decode('ascii')
+    
+    for codec in _DIAGNOSTIC_CODECS:
+        try:
+            text = data.decode(codec)
+        except UnicodeDecodeError:
+            continue
+        # 全角スペース（U+3000）などはデコード後でないと取り除けない
+        return codec, text.strip()
+    
+    return 'ascii', data.decode('ascii', errors='replace').strip()
+
+
+def test_com_port_reading(port='COM3', baudrate=9600, timeout=0.5):
     """
     指定されたCOMポートからのデータ読み取りをテストします。
+    
+    受信データの16進数表示はDEBUGレベルのログとして出力されます。
     """
-    print(f"COMポート {port} を開こうとしています...")
+    log.info("COMポート %s を開こうとしています...", port)
     try:
-        ser = serial.Serial(port, baudrate, timeout=timeout)
-        print(f"{port} を開きました。")
-        print("データ受信中... (Ctrl+Cで停止)")
-        while True:
-            try:
-                data = ser.readline()
-                if data:
-                    # ASCII、UTF-8、Shift_JISでのデコードを試みる
-                    print("受信データ (16進数):", data.hex())
-                    try:
-                        ascii_text = data.decode('ascii', errors='replace').strip()
-                        print(f"ASCII: {ascii_text}")
-                    except:
-                        pass
-                    
-                    try:
-                        utf8_text = data.decode('utf-8', errors='replace').strip()
-                        print(f"UTF-8: {utf8_text}")
-                    except:
-                        pass
-                    
-                    try:
-                        sjis_text = data.decode('shift_jis', errors='replace').strip()
-                        print(f"Shift_JIS: {sjis_text}")
-                    except:
-                        pass
-                    
-                    print("-" * 30)
-                
-                # データが無い場合のCPU使用率を下げるための小さな遅延
-                time.sleep(0.1)
-            except serial.SerialException as e:
-                print(f"COMポートからの読み取りエラー: {e}")
-                break
-            except KeyboardInterrupt:
-                print("COMポートリスナーを停止します。")
-                break
-        ser.close()
-        print(f"{port} を閉じました。")
+        with serial.Serial(port, baudrate, timeout=timeout) as ser:
+            log.info("%s を開きました。", port)
+            log.info("データ受信中... (Ctrl+Cで停止)")
+            # ループ内で使う属性やグローバル名はローカル変数に束縛しておく
+            read_until = ser.read_until
+            decode = _decode_diagnostic
+            is_enabled_for = log.isEnabledFor
+            debug = log.debug
+            info = log.info
+            DEBUG = logging.DEBUG
+            SerialException = serial.SerialException
+            while True:
+                try:
+                    # タイムアウト付きの読み取りでドライバ内で待機するため、sleepは不要
+                    data = read_until(b'\n')
+                    if data:
+                        # DEBUGが無効な場合は16進数変換自体を行わない
+                        if is_enabled_for(DEBUG):
+                            debug("%s", "-" * 30)
+                            debug("受信データ (16進数): %s", data.hex())
+                        # UTF-8、Shift_JISの順に1回だけデコードする
+                        codec, text = decode(data)
+                        info("%s: %s", codec, text)
+                except SerialException as e:
+                    log.error("COMポートからの読み取りエラー: %s", e)
+                    break
+                except KeyboardInterrupt:
+                    log.info("COMポートリスナーを停止します。")
+                    break
+        log.info("%s を閉じました。", port)
     except serial.SerialException as e:
-        print(f"COMポート {port} を開くまたは使用中にエラー: {e}")
-        print("COMポートが正しく、利用可能であり、デバイスが接続されていることを確認してください。")
+        log.error("COMポート %s を開くまたは使用中にエラー: %s", port, e)
+        log.error("COMポートが正しく、利用可能であり、デバイスが接続されていることを確認してください。")
 
 
 def test_keyboard_simulation(text_to_type="テスト入力 ABC 123"):
@@ -292,16 +766,22 @@ def test_keyboard_simulation(text_to_type="テスト入力 ABC 123"):
     print("5秒以内にテキスト入力欄にカーソルを合わせてください...")
     time.sleep(5) # ユーザーがテキストフィールドにフォーカスするための時間
 
-    keyboard = Controller()
     try:
         print("入力中...")
-        keyboard.type(text_to_type)
+        _type_text(text_to_type)
         print("入力完了。")
     except Exception as e:
         print(f"キーボードシミュレーション中のエラー: {e}")
 
 
 if __name__ == "__main__":
+    # --verbose指定時はCOMポート読み取りテストで16進数表示も行う
+    logging.basicConfig(
+        level=logging.DEBUG if '--verbose' in sys.argv else logging.INFO,
+        format='%(message)s',
+        stream=sys.stdout,
+    )
+    
     # コマンドライン引数によるモード選択
     if len(sys.argv) > 1 and sys.argv[1] == "--test":
         print("QR2Key - テストモード")
@@ -339,4 +819,8 @@ if __name__ == "__main__":
             print("テストモードを終了します。")
     else:
         # 通常モード - メインアプリケーション実行
-        main()
+        try:
+            main()
+        except KeyboardInterrupt:
+            # Ctrl+Cでトレースバックを出さずに終了する
+            print("\nQR2Keyを終了します。")
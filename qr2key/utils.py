@@ -1,7 +1,22 @@
 """Utility functions for QR2Key."""
 
+import functools
 import platform
 
+# The OS does not change while the process runs, so resolve it once.
+_SYSTEM = platform.system()
+
+
+@functools.lru_cache(maxsize=1)
+def _platform_info():
+    """Collect platform information once; see get_platform_info()."""
+    return {
+        'system': _SYSTEM,
+        'architecture': platform.architecture()[0],
+        'python_version': platform.python_version(),
+        'is_windows': _SYSTEM == 'Windows',
+    }
+
 
 def get_platform_info():
     """Get platform information.
@@ -9,9 +24,4 @@ def get_platform_info():
     Returns:
         dict: Platform information
     """
-    return {
-        'system': platform.system(),
-        'architecture': platform.architecture()[0],
-        'python_version': platform.python_version(),
-        'is_windows': platform.system() == 'Windows',
-    }
+    return dict(_platform_info())